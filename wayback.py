@@ -14,29 +14,46 @@ import aiohttp
 import pandas as pd
 import time
 import re
+import csv
 import json
-import random
+import orjson
+import itertools
+import math
 import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
 from tqdm import tqdm
 from typing import Optional, Tuple
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, NavigableString
+import soupsieve as sv
 from urllib.parse import urljoin
 
 # ================= CONFIG =================
 
 INPUT_CSV = "missing_wayback_urls_2023_2025.csv"
 WAYBACK_COLUMN = "missing_wayback_urls"
+INPUT_CHUNK_ROWS = 4096
 OUT_CSV = "ai_wayback_unified.csv"
 
 BASE_URL = "https://theresanaiforthat.com/"
+BASE_ORIGIN = BASE_URL.rstrip("/")
 REQUESTS_PER_MIN = 60
 CONCURRENCY = 12
+PARSE_WORKERS = os.cpu_count() or 1
 TIMEOUT = 30
 SAVE_EVERY = 50
-CHECKPOINT_FILE = "wayback_unified_checkpoint.json"
+FLUSH_INTERVAL = 30  # seconds; flush a partial buffer at least this often
+MAX_ATTEMPTS = 7  # per snapshot, including the first request
+MAX_RETRY_AFTER = 120  # seconds; cap on a server-sent Retry-After
+HTML_PARSER = "lxml"  # C parser; "html.parser" is the pure-python fallback
+CHECKPOINT_FILE = "wayback_unified_checkpoint.jsonl"  # one processed url per line
+LEGACY_CHECKPOINT_FILE = "wayback_unified_checkpoint.json"  # old single-array format, still read
 
 # ================= SCHEMAS =================
 # ⬇️ EXACTLY copy your column lists here ⬇️
+# JSON list columns (*_json, versions) hold None (empty cell) when there is
+# nothing to list; read an empty cell as []
 
 COLUMNS_2025 = [
     "name",
@@ -184,29 +201,62 @@ GLOBAL_COLUMNS = sorted(
     }
 )
 
+# every record starts as a shallow copy of this (dict.copy is a C-level copy)
+RECORD_TEMPLATE = dict.fromkeys(GLOBAL_COLUMNS, None)
+
 # ================= RATE LIMITER =================
 
 class RateLimiter:
     def __init__(self, rpm):
-        self.capacity = rpm
-        self.tokens = rpm
-        self.last = time.time()
+        self.interval = 60 / rpm  # seconds between request starts
+        self.next_slot = time.monotonic()
         self.lock = asyncio.Lock()
 
     async def acquire(self):
-        while True:
-            async with self.lock:
-                now = time.time()
-                delta = now - self.last
-                self.tokens = min(self.capacity, self.tokens + delta * (self.capacity / 60))
-                self.last = now
-                if self.tokens >= 1:
-                    self.tokens -= 1
-                    return
-            await asyncio.sleep(0.05)
+        # claim the next free start time under the lock, then sleep until it
+        # outside the lock: one wakeup per request, evenly spaced
+        async with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        await asyncio.sleep(slot - now)
 
 RATE_LIMITER = RateLimiter(REQUESTS_PER_MIN)
 
+# ================= REGEX =================
+# compiled once at import; these run per snapshot / per list item
+
+SNAPSHOT_TS_RE = re.compile(r"/web/(\d{14})/")
+VERSION_TOKEN_RE = re.compile(r"\bv\d+(?:\.\d+)*\b")
+DISCOUNT_VALUE_RE = re.compile(r'^([^"]+?)\s*with code')
+DISCOUNT_CODE_RE = re.compile(r'"([^"]+)"')
+INT_RE = re.compile(r"(\d+)")
+INT_COMMA_RE = re.compile(r"(\d[\d,]*)")
+FLOAT_RE = re.compile(r"(\d+(?:\.\d+)?)")
+BG_URL_RE = re.compile(r'url\((.*?)\)')
+
+# ================= SELECTORS =================
+# per-item CSS selectors, compiled once; bs4's select/select_one take them as-is
+
+SEL_AI_LINK = sv.compile("a.ai_link")
+SEL_EXTERNAL_LINK = sv.compile("a.external_ai_link")
+SEL_DOMAIN = sv.compile(".domain")
+SEL_USE_CASE = sv.compile(".use_case")
+SEL_TASK_LABEL = sv.compile("a.task_label")
+SEL_TAGS = sv.compile(".tags .tag")
+SEL_AVAILABLE = sv.compile(".available_starting")
+SEL_SAVES = sv.compile(".saves")
+SEL_COMMENTS = sv.compile(".comments")
+SEL_AVG_RATING = sv.compile(".average_rating")
+SEL_LAUNCH_DATE = sv.compile(".ai_launch_date")
+SEL_IMG = sv.compile("img")
+SEL_STAR_FULL = sv.compile(".star-full")
+SEL_FOLLOW_COUNTER = sv.compile(".follow_counter")
+SEL_TOOLS_COUNTER = sv.compile(".tools_counter")
+SEL_LIST_ICONS = sv.compile(".ai_list_icons img.taaft_icon")
+SEL_STATS_VIEWS_SPAN = sv.compile(".stats_views span")
+SEL_STATS_VIEWS = sv.compile(".stats_views")
+
 # ================= HELPERS =================
 
 USER_AGENTS = [
@@ -215,22 +265,38 @@ USER_AGENTS = [
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7)"
 ]
 
+# no Accept-Encoding: aiohttp's default offers gzip/deflate, and br only when
+# Brotli is importable, so it never asks for an encoding it can't decode
+HEADER_POOL = [{"User-Agent": ua} for ua in USER_AGENTS]
+HEADER_CYCLE = itertools.cycle(HEADER_POOL)
+
 def headers():
-    return {"User-Agent": random.choice(USER_AGENTS)}
+    # round-robin over prebuilt dicts (aiohttp copies them, never mutates)
+    return next(HEADER_CYCLE)
 
 def extract_year_ts(url: str) -> Tuple[Optional[str], Optional[str]]:
-    m = re.search(r"/web/(\d{14})/", url)
+    m = SNAPSHOT_TS_RE.search(url)
     if not m:
         return None, None
     ts = m.group(1)
     return ts[:4], ts
 
 def init_record(year: str):
-    r = dict.fromkeys(GLOBAL_COLUMNS, None)
+    r = RECORD_TEMPLATE.copy()
     r["_schema"] = year
     r["snapshot_year"] = year
     return r
 
+def init_snapshot_record(year: str, snapshot_url: str):
+    # identity fields every parser sets before reading the page, so a record
+    # built without parsing (empty stub) differs from a parsed one only in content
+    r = init_record(year)
+    r["snapshot_url"] = snapshot_url
+    r["snapshot_timestamp"] = extract_year_ts(snapshot_url)[1]
+    if year in ("2023", "2024"):
+        r["link"] = snapshot_url
+    return r
+
 def safe_find_text(tag, selector_class=None, recursive=False):
     if tag is None:
         return None
@@ -243,6 +309,15 @@ def safe_find_text(tag, selector_class=None, recursive=False):
         return txt.strip()
     return tag.get_text(" ", strip=True) if tag else None
 
+def leaf_text(tag, sep=" "):
+    # single-text nodes (names, versions, prices): take the string directly
+    # instead of walking descendants; same result as get_text(sep, strip=True)
+    s = tag.string
+    if type(s) is NavigableString:
+        return s.strip()
+    return tag.get_text(sep, strip=True)
+
+
 def to_int_or_none(s):
     if s is None:
         return None
@@ -250,13 +325,13 @@ def to_int_or_none(s):
     s_clean = s.strip("() ").replace(",", "")
     if s_clean == "":
         return None
-    if s_clean.isdigit():
-        return int(s_clean)
-    try:
-        if "." in s_clean:
+    if s_clean.isdecimal():
+        return int(s_clean)  # fast path: no exception machinery for plain counts
+    if "." in s_clean:
+        try:
             return float(s_clean)
-    except ValueError:
-        pass
+        except ValueError:
+            pass
     return s
 
 
@@ -273,37 +348,96 @@ def to_float_or_none(s):
         return s
 
 
+@lru_cache(maxsize=16384)
+def join_base(href):
+    # full urljoin for the shapes abs_url can't shortcut (https://, //host, ../);
+    # cached since the same links repeat across cards and snapshots
+    return urljoin(BASE_URL, href)
+
+
+def abs_url(href):
+    # urljoin(BASE_URL, href) minus the urlparse round trips for the common
+    # shapes; anything urljoin would normalize still goes through it
+    if not href:
+        return BASE_URL
+    if (href.startswith(("http://", "data:")) and href.isascii()
+            and "[" not in href and "]" not in href):
+        # scheme differs from BASE_URL's: urljoin returns it untouched (bracketed
+        # or non-ascii hosts still go through it, so bad ones raise the same way)
+        return href
+    if (href.startswith("/") and not href.startswith("//") and "/." not in href
+            and href.isprintable() and not any(ch in href for ch in "?#;")):
+        return BASE_ORIGIN + href
+    return join_base(href)
+
+
+DATE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%Y-%m-%d", "%d %b %Y")  # formats the site emits
+
+@lru_cache(maxsize=4096)
+def to_iso_date(text):
+    # YYYY-MM-DD if it can be read as a date, else the raw text; cached because
+    # the same comment / changelog dates repeat within and across pages
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            pass
+    # anything else: let pandas guess (slow, but rare)
+    try:
+        dt = pd.to_datetime(text, errors="coerce")
+    except Exception:
+        return text
+    return dt.strftime("%Y-%m-%d") if not pd.isna(dt) else text
+
+
+def to_json(obj):
+    # orjson: C-level encoder, emits UTF-8 directly (no ensure_ascii escaping)
+    return orjson.dumps(obj).decode()
+
+
 # ================= HTTP =================
 
+def retry_wait(r, attempt):
+    # honour the server's Retry-After (seconds) instead of guessing, but only
+    # finite values and clamped: float() takes "inf" and sleep(inf) never returns
+    try:
+        v = float(r.headers.get("Retry-After", ""))
+    except ValueError:
+        return 1.8 ** attempt
+    if not math.isfinite(v):
+        return 1.8 ** attempt
+    return min(max(0.0, v), MAX_RETRY_AFTER)
+
+
+# session is the one ClientSession opened in main(): never create one here,
+# or each fetch pays its own TCP + TLS handshake outside the keep-alive pool
 async def fetch(session, url):
     last = None
-    for attempt in range(1, 8):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
         try:
             await RATE_LIMITER.acquire()
             async with session.get(url, headers=headers(), timeout=TIMEOUT) as r:
                 if r.status == 200:
                     return await r.text(errors="ignore"), None
-                if r.status in (429, 502, 503):
-                    await asyncio.sleep(1.8 ** attempt)
+                if r.status == 429 or r.status >= 500:
+                    last = f"HTTP {r.status}"
+                    if attempt < MAX_ATTEMPTS:  # no point waiting after the last try
+                        await asyncio.sleep(retry_wait(r, attempt))
                     continue
                 return None, f"HTTP {r.status}"
         except Exception as e:
             last = e
-            await asyncio.sleep(1.8 ** attempt)
+            if attempt < MAX_ATTEMPTS:
+                await asyncio.sleep(1.8 ** attempt)
     return None, str(last)
 
 # ================= PARSER DISPATCH =================
 # ⚠️ THESE FUNCTIONS WRAP YOUR EXISTING PARSERS
 
 def parse_2023(html: str, snapshot_url: str):
-    year, ts = extract_year_ts(snapshot_url)
-    record = init_record("2023")
-    record["snapshot_url"] = snapshot_url
-    record["snapshot_timestamp"] = ts
-
-    record["link"] = snapshot_url
+    record = init_snapshot_record("2023", snapshot_url)
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, HTML_PARSER)
 
         h1 = soup.find("h1")
         if h1:
@@ -317,13 +451,7 @@ def parse_2023(html: str, snapshot_url: str):
 
             # normalize date if possible
             if date_raw:
-                try:
-                    dt = pd.to_datetime(date_raw, errors="coerce")
-                    record["use_case_created_date"] = (
-                        dt.strftime("%Y-%m-%d") if not pd.isna(dt) else date_raw
-                    )
-                except Exception:
-                    record["use_case_created_date"] = date_raw
+                record["use_case_created_date"] = to_iso_date(date_raw)
             else:
                 record["use_case_created_date"] = None
 
@@ -389,7 +517,7 @@ def parse_2023(html: str, snapshot_url: str):
 
             record["tags_count"] = len(tags_list)
             record["tags"] = " || ".join(tags_list) if tags_list else None
-            record["tags_json"] = json.dumps(tags_list, ensure_ascii=False) if tags_list else None
+            record["tags_json"] = to_json(tags_list) if tags_list else None
             record["tag_price"] = price_text
         else:
             record["tags_count"] = None
@@ -417,7 +545,7 @@ def parse_2023(html: str, snapshot_url: str):
 
             # final assignments
             record["description"] = "\n\n".join(paragraphs) if paragraphs else None
-            record["description_json"] = json.dumps(paragraphs, ensure_ascii=False) if paragraphs else None
+            record["description_json"] = to_json(paragraphs) if paragraphs else None
             record["description_length"] = len(record["description"]) if record["description"] else 0
         else:
             record["description"] = None
@@ -431,31 +559,31 @@ def parse_2023(html: str, snapshot_url: str):
             item = {}
 
             # ---------- NAME + INTERNAL LINK ----------
-            ai_link = li.select_one("a.ai_link")
+            ai_link = li.select_one(SEL_AI_LINK)
             if ai_link:
                 item["name"] = ai_link.get_text(" ", strip=True)
-                item["internal_link"] = urljoin(BASE_URL, ai_link.get("href"))
+                item["internal_link"] = abs_url(ai_link.get("href"))
             else:
                 item["name"] = None
                 item["internal_link"] = None
 
             # ---------- EXTERNAL LINK ----------
-            ext = li.select_one("a.external_ai_link")
+            ext = li.select_one(SEL_EXTERNAL_LINK)
             item["external_link"] = ext.get("href") if ext else None
 
             # ---------- DOMAIN (format 1 only, optional) ----------
-            domain = li.select_one(".domain")
+            domain = li.select_one(SEL_DOMAIN)
             item["domain"] = domain.get_text(strip=True).strip("()") if domain else None
 
             # ---------- USE CASE ----------
-            use_case = li.select_one(".use_case")
+            use_case = li.select_one(SEL_USE_CASE)
             item["use_case"] = use_case.get_text(" ", strip=True) if use_case else None
 
             # ---------- TASK ----------
-            task = li.select_one("a.task_label")
+            task = li.select_one(SEL_TASK_LABEL)
             if task:
                 item["task_name"] = task.get_text(" ", strip=True)
-                item["task_link"] = urljoin(BASE_URL, task.get("href"))
+                item["task_link"] = abs_url(task.get("href"))
             else:
                 item["task_name"] = None
                 item["task_link"] = None
@@ -463,7 +591,7 @@ def parse_2023(html: str, snapshot_url: str):
             # ---------- TAGS + PRICE ----------
             tags = []
             price = None
-            for t in li.select(".tags .tag"):
+            for t in li.select(SEL_TAGS):
                 if "price" in t.get("class", []):
                     price = t.get_text(strip=True)
                 else:
@@ -473,7 +601,7 @@ def parse_2023(html: str, snapshot_url: str):
             item["price_label"] = price
 
             # ---------- RELEASE DATE ----------
-            date_div = li.select_one(".available_starting")
+            date_div = li.select_one(SEL_AVAILABLE)
             if date_div:
                 date_text = date_div.get_text(" ", strip=True)
                 item["release_date"] = date_text
@@ -481,28 +609,28 @@ def parse_2023(html: str, snapshot_url: str):
                 item["release_date"] = None
 
             # ---------- SAVES ----------
-            saves = li.select_one(".saves")
+            saves = li.select_one(SEL_SAVES)
             item["saves"] = int(saves.get_text(strip=True)) if saves and saves.get_text(strip=True).isdigit() else None
 
             # ---------- COMMENTS ----------
-            comments = li.select_one(".comments")
+            comments = li.select_one(SEL_COMMENTS)
             item["comments"] = int(comments.get_text(strip=True)) if comments else None
 
             # ---------- RATING ----------
-            rating = li.select_one(".average_rating")
+            rating = li.select_one(SEL_AVG_RATING)
             item["rating"] = rating.get_text(strip=True) if rating else None
 
             # ---------- PRICING ----------
-            pricing = li.select_one(".ai_launch_date")
+            pricing = li.select_one(SEL_LAUNCH_DATE)
             item["pricing_text"] = pricing.get_text(" ", strip=True) if pricing else None
 
             # ---------- IMAGE ----------
-            img = li.select_one("img")
+            img = li.select_one(SEL_IMG)
             item["image"] = img.get("src") if img else None
 
             items.append(item)
         record["listings_count"] = len(items)
-        record["listings_json"] = json.dumps(items, ensure_ascii=False)
+        record["listings_json"] = to_json(items) if items else None
 
 
         #--------------
@@ -519,15 +647,15 @@ def parse_2023(html: str, snapshot_url: str):
 
                 items.append({
                     "query": text,
-                    "link": urljoin(BASE_URL, href)
+                    "link": abs_url(href)
                 })
 
             record["also_searched_count"] = len(items)
-            record["also_searched_json"] = json.dumps(items, ensure_ascii=False)
+            record["also_searched_json"] = to_json(items) if items else None
 
         else:
             record["also_searched_count"] = 0
-            record["also_searched_json"] = json.dumps([], ensure_ascii=False)
+            record["also_searched_json"] = None
 
     except Exception as e:
         print(f"[get_cols] unexpected error on : {e}")
@@ -537,14 +665,9 @@ def parse_2023(html: str, snapshot_url: str):
     return record
 
 def parse_2024(html: str, snapshot_url: str):
-    year, ts = extract_year_ts(snapshot_url)
-    record = init_record("2024")
-    record["snapshot_url"] = snapshot_url
-    record["snapshot_timestamp"] = ts
-
-    record["link"] = snapshot_url
+    record = init_snapshot_record("2024", snapshot_url)
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, HTML_PARSER)
 
         # name
         h1 = soup.find("h1", class_="title_inner")
@@ -557,7 +680,7 @@ def parse_2024(html: str, snapshot_url: str):
         if tool_a and tool_a.get("href"):
             href = tool_a.get("href")
             # normalize into absolute unless it's already external
-            record["tool_link"] = urljoin(BASE_URL, href) if href.startswith("/") else href
+            record["tool_link"] = abs_url(href) if href.startswith("/") else href
         else:
             record["tool_link"] = None
 
@@ -568,15 +691,12 @@ def parse_2024(html: str, snapshot_url: str):
             desc_block = soup.select_one("div.description")
 
         if desc_block:
-            # get the raw HTML text with <br> converted to newline
-            desc_html = desc_block.decode_contents()
-
-            # Replace <br> tags manually with newline
-            desc_html = desc_html.replace("<br>", "\n").replace("<br/>", "\n").replace("<br />", "\n")
-
-            # Now strip HTML tags using BeautifulSoup again (quick clean-up)
-            temp_soup = BeautifulSoup(desc_html, "html.parser")
-            cleaned_desc = temp_soup.get_text("\n", strip=True)
+            # turn <br> into newlines in place and merge the adjacent strings,
+            # so blank lines survive get_text without re-parsing the block
+            for br in desc_block.find_all("br"):
+                br.replace_with("\n")
+            desc_block.smooth()
+            cleaned_desc = desc_block.get_text("\n", strip=True)
 
             record["description"] = cleaned_desc if cleaned_desc else None
         else:
@@ -652,7 +772,7 @@ def parse_2024(html: str, snapshot_url: str):
                 # regex find version token like v1 or v1.2.3
                 ver_token = None
                 if ver_text:
-                    m = re.search(r"\bv\d+(?:\.\d+)*\b", ver_text)
+                    m = VERSION_TOKEN_RE.search(ver_text)
                     if m:
                         ver_token = m.group(0)
                     else:
@@ -666,14 +786,7 @@ def parse_2024(html: str, snapshot_url: str):
                 # try to canonicalize to ISO date (YYYY-MM-DD) using pandas (falls back to raw text)
                 date_iso = None
                 if date_text:
-                    try:
-                        dt = pd.to_datetime(date_text, errors="coerce")
-                        if not pd.isna(dt):
-                            date_iso = dt.strftime("%Y-%m-%d")
-                        else:
-                            date_iso = date_text  # keep original if parsing failed
-                    except Exception:
-                        date_iso = date_text
+                    date_iso = to_iso_date(date_text)  # keeps original if parsing fails
 
                 # changelog text (the free text in version_changelog)
                 changelog_div = vdiv.find("div", class_="version_changelog")
@@ -694,7 +807,7 @@ def parse_2024(html: str, snapshot_url: str):
         # final assignment to the record
         record["versions_count"] = len(versions_list)
         # store JSON string (safe for CSV); analytics team can parse this JSON later
-        record["versions"] = json.dumps(versions_list, ensure_ascii=False)
+        record["versions"] = to_json(versions_list) if versions_list else None
 
 
         pros_cons_section = soup.find("section", id="pros-and-cons")
@@ -723,8 +836,8 @@ def parse_2024(html: str, snapshot_url: str):
             record["pros"] = " || ".join(pros_items) if pros_items else None
             record["cons"] = " || ".join(cons_items) if cons_items else None
 
-            record["pros_json"] = json.dumps(pros_items, ensure_ascii=False) if pros_items else None
-            record["cons_json"] = json.dumps(cons_items, ensure_ascii=False) if cons_items else None
+            record["pros_json"] = to_json(pros_items) if pros_items else None
+            record["cons_json"] = to_json(cons_items) if cons_items else None
 
         else:
             record["pros_count"] = None
@@ -741,7 +854,7 @@ def parse_2024(html: str, snapshot_url: str):
             als = [a.get_text(" ", strip=True) for a in also_div.find_all("a")]
 
             record["also_searched"] = " || ".join(als) if als else None
-            record["also_searched_json"] = json.dumps(als, ensure_ascii=False) if als else None
+            record["also_searched_json"] = to_json(als) if als else None
             record["also_searched_count"] = len(als) if als else 0
         else:
             record["also_searched"] = None
@@ -768,13 +881,19 @@ def parse_2024(html: str, snapshot_url: str):
         # -------------------------
         wrappers = soup.find_all("div", class_="comment-wrapper")
         comments_map = {}   # id -> dict (with children list)
-        parent_of = {}      # id -> parent_id
+        roots = []          # top-level comments
+        wrapper_cid = {}    # id(wrapper) -> data-id of its own comment (None if missing)
+        wrapper_ids = {id(w) for w in wrappers}
 
         for w in wrappers:
             c = w.find("div", class_="comment")
+            if c and next(p for p in c.parents if id(p) in wrapper_ids) is not w:
+                # no comment of its own: c is a reply's, handled by the reply's wrapper
+                c = None
+            cid = c.get("data-id") if c else None
+            wrapper_cid[id(w)] = cid
             if not c:
                 continue
-            cid = c.get("data-id")
             if not cid:
                 # skip if no id (rare)
                 continue
@@ -782,9 +901,9 @@ def parse_2024(html: str, snapshot_url: str):
             # user id (data-user on comment), username, profile url
             user_id = c.get("data-user")
             user_name_tag = c.find("div", class_="user_name")
-            user_name = user_name_tag.get_text(strip=True) if user_name_tag else None
+            user_name = leaf_text(user_name_tag, "") if user_name_tag else None
             profile_a = c.find("a", class_="user_card")
-            user_profile = urljoin(BASE_URL, profile_a.get("href")) if profile_a and profile_a.get("href") else None
+            user_profile = abs_url(profile_a.get("href")) if profile_a and profile_a.get("href") else None
 
             # date (text inside .comment_date > a). Normalize to yyyy-mm-dd if possible
             date_tag = c.find("div", class_="comment_date")
@@ -794,20 +913,13 @@ def parse_2024(html: str, snapshot_url: str):
                 at = date_tag.find("a")
                 if at:
                     date_text = at.get_text(" ", strip=True)
-                    try:
-                        dt = pd.to_datetime(date_text, errors="coerce")
-                        if not pd.isna(dt):
-                            date_iso = dt.strftime("%Y-%m-%d")
-                        else:
-                            date_iso = date_text
-                    except Exception:
-                        date_iso = date_text
+                    date_iso = to_iso_date(date_text)
 
             # rating: count .star-full inside comment_rating
             rating_wrap = c.find("div", class_="comment_rating")
             rating_val = None
             if rating_wrap:
-                rating_val = len(rating_wrap.select(".star-full"))
+                rating_val = len(rating_wrap.select(SEL_STAR_FULL))
 
             # body text
             body_tag = c.find("div", class_="comment_body")
@@ -818,12 +930,9 @@ def parse_2024(html: str, snapshot_url: str):
             up_val = None
             if up_tag:
                 ut = up_tag.get_text(" ", strip=True)
-                m2 = re.search(r"(\d+)", ut)
+                m2 = INT_RE.search(ut)
                 if m2:
-                    try:
-                        up_val = int(m2.group(1))
-                    except Exception:
-                        up_val = None
+                    up_val = int(m2.group(1))  # regex matched digits: int() cannot fail
 
             # Build initial comment dict (children empty list)
             comments_map[cid] = {
@@ -839,34 +948,21 @@ def parse_2024(html: str, snapshot_url: str):
                 "children": []
             }
 
-            # determine parent comment-wrapper (immediate parent wrapper)
-            parent_wrapper = w.find_parent("div", class_="comment-wrapper")
-            if parent_wrapper:
-                # parent_wrapper may contain its own comment; find parent's comment div
-                parent_comment = parent_wrapper.find("div", class_="comment")
-                if parent_comment and parent_comment.get("data-id"):
-                    parent_of[cid] = parent_comment.get("data-id")
-                else:
-                    parent_of[cid] = None
-            else:
-                parent_of[cid] = None
+            # determine parent comment-wrapper (immediate parent wrapper): wrappers come
+            # in document order, so an enclosing one is already in wrapper_cid
+            parent_wrapper = next((p for p in w.parents if id(p) in wrapper_cid), None)
+            pid = wrapper_cid[id(parent_wrapper)] if parent_wrapper else None
 
-        # now link children to parents (linear assembly)
-        for cid, pdata in list(parent_of.items()):
-            pid = pdata
-            if pid and pid in comments_map:
+            # link while walking: a parent always precedes its replies
+            if not pid:
+                roots.append(comments_map[cid])
+            elif pid in comments_map:
                 comments_map[pid]["children"].append(comments_map[cid])
 
-        # collect roots (top-level comments)
-        roots = []
-        for cid, comment_obj in comments_map.items():
-            if not parent_of.get(cid):
-                roots.append(comment_obj)
-
         # final assignment
         record["comments_count"] = len(comments_map)
         # store JSON string (nested comments). analytics can parse this.
-        record["comments_json"] = json.dumps(roots, ensure_ascii=False) if roots else json.dumps([], ensure_ascii=False)
+        record["comments_json"] = to_json(roots) if roots else None
 
         # -------------------------
         # single task_label extraction (name + link)
@@ -879,7 +975,7 @@ def parse_2024(html: str, snapshot_url: str):
 
             # absolute link
             href = tlabel.get("href")
-            record["task_label_url"] = urljoin(BASE_URL, href) if href else None
+            record["task_label_url"] = abs_url(href) if href else None
         else:
             record["task_label_name"] = None
             record["task_label_url"] = None
@@ -909,7 +1005,7 @@ def parse_2024(html: str, snapshot_url: str):
                     qa_items.append({"question": question, "answer": answer})
 
             record["faq_count"] = len(qa_items)
-            record["faq_json"] = json.dumps(qa_items, ensure_ascii=False) if qa_items else json.dumps([], ensure_ascii=False)
+            record["faq_json"] = to_json(qa_items) if qa_items else None
         else:
             record["faq_count"] = None
             record["faq_json"] = None
@@ -926,24 +1022,25 @@ def parse_2024(html: str, snapshot_url: str):
 
             for li in cards:
                 # ids / attributes
-                ai_id = li.get("data-id")
-                name = li.get("data-name")
-                task_id = li.get("data-task_id")
-                fid = li.get("data-fid")
-                featured = li.get("data-featured") == "true"
+                attrs = li.attrs
+                ai_id = attrs.get("data-id")
+                name = attrs.get("data-name")
+                task_id = attrs.get("data-task_id")
+                fid = attrs.get("data-fid")
+                featured = attrs.get("data-featured") == "true"
 
                 # internal tool link
                 tool_a = li.find("a", class_="ai_link")
-                tool_link = urljoin(BASE_URL, tool_a.get("href")) if tool_a else None
+                tool_link = abs_url(tool_a.get("href")) if tool_a else None
 
                 # external website
                 ext_a = li.find("a", class_="external_ai_link")
-                external_link = urljoin(BASE_URL, ext_a.get("href")) if ext_a else None
+                external_link = abs_url(ext_a.get("href")) if ext_a else None
 
                 # task
                 task_a = li.find("a", class_="task_label")
                 task_name = task_a.get_text(" ", strip=True) if task_a else None
-                task_link = urljoin(BASE_URL, task_a.get("href")) if task_a else None
+                task_link = abs_url(task_a.get("href")) if task_a else None
 
                 # description
                 desc_tag = li.find("div", class_="short_desc")
@@ -964,11 +1061,11 @@ def parse_2024(html: str, snapshot_url: str):
 
                 # pricing
                 price_tag = li.find("a", class_="ai_launch_date")
-                pricing = price_tag.get_text(" ", strip=True) if price_tag else None
+                pricing = leaf_text(price_tag) if price_tag else None
 
                 # screenshot
                 img = li.find("img", class_="ai_image")
-                screenshot = urljoin(BASE_URL, img.get("src")) if img else None
+                screenshot = abs_url(img.get("src")) if img else None
 
                 cards_data.append({
                     "id": ai_id,
@@ -989,7 +1086,7 @@ def parse_2024(html: str, snapshot_url: str):
                 })
 
         record["featured_cards_count"] = len(cards_data)
-        record["featured_cards_json"] = json.dumps(cards_data, ensure_ascii=False)
+        record["featured_cards_json"] = to_json(cards_data) if cards_data else None
 
         #-------------------------
         # All tools extraction
@@ -999,24 +1096,25 @@ def parse_2024(html: str, snapshot_url: str):
         cards = soup.find_all("li", attrs={"data-id": True, "data-name": True})
 
         for li in cards:
-            ai_id = li.get("data-id")
-            name = li.get("data-name")
-            task = li.get("data-task")
-            task_id = li.get("data-task_id")
-            task_slug = li.get("data-task_slug")
+            attrs = li.attrs
+            ai_id = attrs.get("data-id")
+            name = attrs.get("data-name")
+            task = attrs.get("data-task")
+            task_id = attrs.get("data-task_id")
+            task_slug = attrs.get("data-task_slug")
 
             # internal tool page
             tool_a = li.find("a", class_="ai_link")
-            tool_link = urljoin(BASE_URL, tool_a.get("href")) if tool_a else None
+            tool_link = abs_url(tool_a.get("href")) if tool_a else None
 
             # external website
             ext_a = li.find("a", class_="external_ai_link")
-            external_link = urljoin(BASE_URL, ext_a.get("href")) if ext_a else None
+            external_link = abs_url(ext_a.get("href")) if ext_a else None
 
             # task label
             task_a = li.find("a", class_="task_label")
             task_name = task_a.get_text(" ", strip=True) if task_a else task
-            task_link = urljoin(BASE_URL, task_a.get("href")) if task_a else None
+            task_link = abs_url(task_a.get("href")) if task_a else None
 
             # description
             desc_tag = li.find("div", class_="short_desc")
@@ -1028,11 +1126,11 @@ def parse_2024(html: str, snapshot_url: str):
 
             # pricing
             price_tag = li.find("a", class_="ai_launch_date")
-            pricing = price_tag.get_text(" ", strip=True) if price_tag else None
+            pricing = leaf_text(price_tag) if price_tag else None
 
             # icon
             img = li.find("img")
-            icon = urljoin(BASE_URL, img.get("src")) if img and img.get("src") else None
+            icon = abs_url(img.get("src")) if img and img.get("src") else None
 
             cards_data.append({
                 "id": ai_id,
@@ -1050,7 +1148,7 @@ def parse_2024(html: str, snapshot_url: str):
             })
 
         record["tools_count"] = len(cards_data)
-        record["tools_json"] = json.dumps(cards_data, ensure_ascii=False)
+        record["tools_json"] = to_json(cards_data) if cards_data else None
 
 
     except Exception as e:
@@ -1058,14 +1156,18 @@ def parse_2024(html: str, snapshot_url: str):
 
     return record
 
+# classes read from each 2025 <li data-id> card, collected in one sweep
+CARD_CLASSES = {
+    "ai_link", "short_desc", "stats", "ai_launch_date", "released", "open_ai",
+    "visit_ai_website_link", "views_count_count", "version_changelog",
+    "taaft_icon", "external_ai_link", "task_label"
+}
+
 def parse_2025(html: str, snapshot_url: str):
-    year, ts = extract_year_ts(snapshot_url)
-    record = init_record("2025")
-    record["snapshot_url"] = snapshot_url
-    record["snapshot_timestamp"] = ts
+    record = init_snapshot_record("2025", snapshot_url)
 
     try:
-        soup = BeautifulSoup(html, "html.parser")
+        soup = BeautifulSoup(html, HTML_PARSER)
 
         # name
         h1 = soup.find("h1", class_="title_inner")
@@ -1078,7 +1180,7 @@ def parse_2025(html: str, snapshot_url: str):
         if tool_a and tool_a.get("href"):
             href = tool_a.get("href")
             # normalize into absolute unless it's already external
-            record["tool_link"] = urljoin(BASE_URL, href) if href.startswith("/") else href
+            record["tool_link"] = abs_url(href) if href.startswith("/") else href
         else:
             record["tool_link"] = None
 
@@ -1089,15 +1191,12 @@ def parse_2025(html: str, snapshot_url: str):
             desc_block = soup.select_one("div.description.ai_description")
 
         if desc_block:
-            # get the raw HTML text with <br> converted to newline
-            desc_html = desc_block.decode_contents()
-
-            # Replace <br> tags manually with newline
-            desc_html = desc_html.replace("<br>", "\n").replace("<br/>", "\n").replace("<br />", "\n")
-
-            # Now strip HTML tags using BeautifulSoup again (quick clean-up)
-            temp_soup = BeautifulSoup(desc_html, "html.parser")
-            cleaned_desc = temp_soup.get_text("\n", strip=True)
+            # turn <br> into newlines in place and merge the adjacent strings,
+            # so blank lines survive get_text without re-parsing the block
+            for br in desc_block.find_all("br"):
+                br.replace_with("\n")
+            desc_block.smooth()
+            cleaned_desc = desc_block.get_text("\n", strip=True)
 
             record["description"] = cleaned_desc if cleaned_desc else None
         else:
@@ -1145,7 +1244,7 @@ def parse_2025(html: str, snapshot_url: str):
                 full_value = value_tag.get_text(" ", strip=True)
 
                 # the value part BEFORE the "with code"
-                m_val = re.search(r'^([^"]+?)\s*with code', full_value)
+                m_val = DISCOUNT_VALUE_RE.search(full_value)
                 if m_val:
                     value_text = m_val.group(1).strip()
                 else:
@@ -1156,7 +1255,7 @@ def parse_2025(html: str, snapshot_url: str):
                 code_span = value_tag.find("span", class_="pricing-code")
                 if code_span:
                     # usually text: with code "TAAFT"
-                    m_code = re.search(r'"([^"]+)"', code_span.get_text(" ", strip=True))
+                    m_code = DISCOUNT_CODE_RE.search(code_span.get_text(" ", strip=True))
                     if m_code:
                         code_text = m_code.group(1).strip()
 
@@ -1237,8 +1336,8 @@ def parse_2025(html: str, snapshot_url: str):
 
             record["socials_count"] = len(social_names) if social_names else 0
             record["socials"] = " || ".join(social_names) if social_names else None
-            record["socials_json"] = json.dumps(social_names, ensure_ascii=False) if social_names else None
-            record["socials_links_json"] = json.dumps(social_links, ensure_ascii=False) if social_links else None
+            record["socials_json"] = to_json(social_names) if social_names else None
+            record["socials_links_json"] = to_json(social_links) if social_links else None
 
         else:
             record["socials_count"] = None
@@ -1265,7 +1364,7 @@ def parse_2025(html: str, snapshot_url: str):
             record["author_username"] = uname_tag.get_text(strip=True) if uname_tag else None
 
             # profile URL (absolute)
-            record["author_profile_url"] = urljoin(BASE_URL, uname_tag.get("href")) if uname_tag and uname_tag.get("href") else None
+            record["author_profile_url"] = abs_url(uname_tag.get("href")) if uname_tag and uname_tag.get("href") else None
 
             # bio
             bio_tag = author_wrap.find("p", class_="user_bio")
@@ -1284,7 +1383,7 @@ def parse_2025(html: str, snapshot_url: str):
                         "link": href
                     })
 
-            record["author_socials_json"] = json.dumps(socials, ensure_ascii=False) if socials else None
+            record["author_socials_json"] = to_json(socials) if socials else None
             record["author_socials_count"] = len(socials) if socials else 0
 
         else:
@@ -1318,7 +1417,7 @@ def parse_2025(html: str, snapshot_url: str):
                 # regex find version token like v1 or v1.2.3
                 ver_token = None
                 if ver_text:
-                    m = re.search(r"\bv\d+(?:\.\d+)*\b", ver_text)
+                    m = VERSION_TOKEN_RE.search(ver_text)
                     if m:
                         ver_token = m.group(0)
                     else:
@@ -1332,14 +1431,7 @@ def parse_2025(html: str, snapshot_url: str):
                 # try to canonicalize to ISO date (YYYY-MM-DD) using pandas (falls back to raw text)
                 date_iso = None
                 if date_text:
-                    try:
-                        dt = pd.to_datetime(date_text, errors="coerce")
-                        if not pd.isna(dt):
-                            date_iso = dt.strftime("%Y-%m-%d")
-                        else:
-                            date_iso = date_text  # keep original if parsing failed
-                    except Exception:
-                        date_iso = date_text
+                    date_iso = to_iso_date(date_text)  # keeps original if parsing fails
 
                 # changelog text (the free text in version_changelog)
                 changelog_div = vdiv.find("div", class_="version_changelog")
@@ -1360,7 +1452,7 @@ def parse_2025(html: str, snapshot_url: str):
         # final assignment to the record
         record["versions_count"] = len(versions_list)
         # store JSON string (safe for CSV); analytics team can parse this JSON later
-        record["versions"] = json.dumps(versions_list, ensure_ascii=False)
+        record["versions"] = to_json(versions_list) if versions_list else None
 
 
         pros_cons_section = soup.find("section", id="pros-and-cons")
@@ -1378,8 +1470,8 @@ def parse_2025(html: str, snapshot_url: str):
             record["cons"] = " || ".join(cons_items) if cons_items else None
 
             # analytics-friendly JSON (easy to parse later)
-            record["pros_json"] = json.dumps(pros_items, ensure_ascii=False) if pros_items else None
-            record["cons_json"] = json.dumps(cons_items, ensure_ascii=False) if cons_items else None
+            record["pros_json"] = to_json(pros_items) if pros_items else None
+            record["cons_json"] = to_json(cons_items) if cons_items else None
         else:
             record["pros_count"] = None
             record["cons_count"] = None
@@ -1394,7 +1486,7 @@ def parse_2025(html: str, snapshot_url: str):
             als = [a.get_text(" ", strip=True) for a in also_div.find_all("a")]
 
             record["also_searched"] = " || ".join(als) if als else None
-            record["also_searched_json"] = json.dumps(als, ensure_ascii=False) if als else None
+            record["also_searched_json"] = to_json(als) if als else None
             record["also_searched_count"] = len(als) if als else 0
         else:
             record["also_searched"] = None
@@ -1414,7 +1506,7 @@ def parse_2025(html: str, snapshot_url: str):
                     models.append(txt)
 
             record["model_types"] = " || ".join(models) if models else None
-            record["model_types_json"] = json.dumps(models, ensure_ascii=False) if models else None
+            record["model_types_json"] = to_json(models) if models else None
             record["model_types_count"] = len(models) if models else 0
         else:
             record["model_types"] = None
@@ -1441,10 +1533,9 @@ def parse_2025(html: str, snapshot_url: str):
                 # prefer svg <title> values
                 for svg in input_block.find_all("svg"):
                     title = svg.find("title")
-                    if title and title.get_text(strip=True):
-                        tok = title.get_text(strip=True)
-                        if tok:
-                            inputs_list.append(tok.strip())
+                    tok = title.get_text(strip=True) if title else None
+                    if tok:
+                        inputs_list.append(tok)
 
                 # fallback: pick inline text nodes after label (exclude the word "Inputs")
                 inline_texts = [t.strip() for t in input_block.find_all(string=True) if t.strip()]
@@ -1465,10 +1556,9 @@ def parse_2025(html: str, snapshot_url: str):
             if output_block:
                 for svg in output_block.find_all("svg"):
                     title = svg.find("title")
-                    if title and title.get_text(strip=True):
-                        tok = title.get_text(strip=True)
-                        if tok:
-                            outputs_list.append(tok.strip())
+                    tok = title.get_text(strip=True) if title else None
+                    if tok:
+                        outputs_list.append(tok)
 
                 inline_texts = [t.strip() for t in output_block.find_all(string=True) if t.strip()]
                 for t in inline_texts:
@@ -1477,29 +1567,9 @@ def parse_2025(html: str, snapshot_url: str):
                     if t not in outputs_list:
                         outputs_list.append(t)
 
-        # Normalize tokens to canonical categories (small inline mapping, no new defs)
-        def _norm(tok):
-            if not tok:
-                return None
-            s = tok.strip().lower()
-            return s
-
-        # apply normalization + dedupe preserving order
-        seen = set()
-        final_inputs = []
-        for tok in inputs_list:
-            nm = _norm(tok)
-            if nm and nm not in seen:
-                seen.add(nm)
-                final_inputs.append(nm)
-
-        seen = set()
-        final_outputs = []
-        for tok in outputs_list:
-            nm = _norm(tok)
-            if nm and nm not in seen:
-                seen.add(nm)
-                final_outputs.append(nm)
+        # lowercase + dedupe preserving order
+        final_inputs = list(dict.fromkeys(t.strip().lower() for t in inputs_list if t and t.strip()))
+        final_outputs = list(dict.fromkeys(t.strip().lower() for t in outputs_list if t and t.strip()))
 
         # assign to record
         record["modalities_inputs_count"] = len(final_inputs) if final_inputs else 0
@@ -1508,8 +1578,8 @@ def parse_2025(html: str, snapshot_url: str):
         record["modalities_inputs"] = " || ".join(final_inputs) if final_inputs else None
         record["modalities_outputs"] = " || ".join(final_outputs) if final_outputs else None
 
-        record["modalities_inputs_json"] = json.dumps(final_inputs, ensure_ascii=False) if final_inputs else None
-        record["modalities_outputs_json"] = json.dumps(final_outputs, ensure_ascii=False) if final_outputs else None
+        record["modalities_inputs_json"] = to_json(final_inputs) if final_inputs else None
+        record["modalities_outputs_json"] = to_json(final_outputs) if final_outputs else None
 
         # -------------------------
         # leaderboard rank & score
@@ -1527,7 +1597,7 @@ def parse_2025(html: str, snapshot_url: str):
             # score
             score_tag = leader.find("span", class_="score")
             if score_tag:
-                score_text = score_tag.get_text(strip=True)
+                score_text = leaf_text(score_tag, "")
                 record["leaderboard_score"] = to_int_or_none(score_text)
             else:
                 record["leaderboard_score"] = None
@@ -1540,13 +1610,19 @@ def parse_2025(html: str, snapshot_url: str):
         # -------------------------
         wrappers = soup.find_all("div", class_="comment-wrapper")
         comments_map = {}   # id -> dict (with children list)
-        parent_of = {}      # id -> parent_id
+        roots = []          # top-level comments
+        wrapper_cid = {}    # id(wrapper) -> data-id of its own comment (None if missing)
+        wrapper_ids = {id(w) for w in wrappers}
 
         for w in wrappers:
             c = w.find("div", class_="comment")
+            if c and next(p for p in c.parents if id(p) in wrapper_ids) is not w:
+                # no comment of its own: c is a reply's, handled by the reply's wrapper
+                c = None
+            cid = c.get("data-id") if c else None
+            wrapper_cid[id(w)] = cid
             if not c:
                 continue
-            cid = c.get("data-id")
             if not cid:
                 # skip if no id (rare)
                 continue
@@ -1554,21 +1630,18 @@ def parse_2025(html: str, snapshot_url: str):
             # user id (data-user on comment), username, profile url
             user_id = c.get("data-user")
             user_name_tag = c.find("div", class_="user_name")
-            user_name = user_name_tag.get_text(strip=True) if user_name_tag else None
+            user_name = leaf_text(user_name_tag, "") if user_name_tag else None
             profile_a = c.find("a", class_="user_card")
-            user_profile = urljoin(BASE_URL, profile_a.get("href")) if profile_a and profile_a.get("href") else None
+            user_profile = abs_url(profile_a.get("href")) if profile_a and profile_a.get("href") else None
 
             # karma (like "🙏 3 karma") → extract first integer if present
             karma_tag = c.find("span", class_="user_karma")
             karma_val = None
             if karma_tag:
                 kt = karma_tag.get_text(" ", strip=True)
-                m = re.search(r"(\d+)", kt)
+                m = INT_RE.search(kt)
                 if m:
-                    try:
-                        karma_val = int(m.group(1))
-                    except Exception:
-                        karma_val = None
+                    karma_val = int(m.group(1))  # regex matched digits: int() cannot fail
 
             # date (text inside .comment_date > a). Normalize to yyyy-mm-dd if possible
             date_tag = c.find("div", class_="comment_date")
@@ -1578,14 +1651,7 @@ def parse_2025(html: str, snapshot_url: str):
                 at = date_tag.find("a")
                 if at:
                     date_text = at.get_text(" ", strip=True)
-                    try:
-                        dt = pd.to_datetime(date_text, errors="coerce")
-                        if not pd.isna(dt):
-                            date_iso = dt.strftime("%Y-%m-%d")
-                        else:
-                            date_iso = date_text
-                    except Exception:
-                        date_iso = date_text
+                    date_iso = to_iso_date(date_text)
 
             # version they commented for (e.g., @9.6.0)
             version_tag = c.find("div", class_="comment_for_version")
@@ -1595,7 +1661,7 @@ def parse_2025(html: str, snapshot_url: str):
             rating_wrap = c.find("div", class_="comment_rating")
             rating_val = None
             if rating_wrap:
-                rating_val = len(rating_wrap.select(".star-full"))
+                rating_val = len(rating_wrap.select(SEL_STAR_FULL))
 
             # body text
             body_tag = c.find("div", class_="comment_body")
@@ -1606,12 +1672,9 @@ def parse_2025(html: str, snapshot_url: str):
             up_val = None
             if up_tag:
                 ut = up_tag.get_text(" ", strip=True)
-                m2 = re.search(r"(\d+)", ut)
+                m2 = INT_RE.search(ut)
                 if m2:
-                    try:
-                        up_val = int(m2.group(1))
-                    except Exception:
-                        up_val = None
+                    up_val = int(m2.group(1))  # regex matched digits: int() cannot fail
 
             # Build initial comment dict (children empty list)
             comments_map[cid] = {
@@ -1629,34 +1692,21 @@ def parse_2025(html: str, snapshot_url: str):
                 "children": []
             }
 
-            # determine parent comment-wrapper (immediate parent wrapper)
-            parent_wrapper = w.find_parent("div", class_="comment-wrapper")
-            if parent_wrapper:
-                # parent_wrapper may contain its own comment; find parent's comment div
-                parent_comment = parent_wrapper.find("div", class_="comment")
-                if parent_comment and parent_comment.get("data-id"):
-                    parent_of[cid] = parent_comment.get("data-id")
-                else:
-                    parent_of[cid] = None
-            else:
-                parent_of[cid] = None
+            # determine parent comment-wrapper (immediate parent wrapper): wrappers come
+            # in document order, so an enclosing one is already in wrapper_cid
+            parent_wrapper = next((p for p in w.parents if id(p) in wrapper_cid), None)
+            pid = wrapper_cid[id(parent_wrapper)] if parent_wrapper else None
 
-        # now link children to parents (linear assembly)
-        for cid, pdata in list(parent_of.items()):
-            pid = pdata
-            if pid and pid in comments_map:
+            # link while walking: a parent always precedes its replies
+            if not pid:
+                roots.append(comments_map[cid])
+            elif pid in comments_map:
                 comments_map[pid]["children"].append(comments_map[cid])
 
-        # collect roots (top-level comments)
-        roots = []
-        for cid, comment_obj in comments_map.items():
-            if not parent_of.get(cid):
-                roots.append(comment_obj)
-
         # final assignment
         record["comments_count"] = len(comments_map)
         # store JSON string (nested comments). analytics can parse this.
-        record["comments_json"] = json.dumps(roots, ensure_ascii=False) if roots else json.dumps([], ensure_ascii=False)
+        record["comments_json"] = to_json(roots) if roots else None
 
         # -------------------------
         # embedded video / visit site / views extraction
@@ -1678,7 +1728,7 @@ def parse_2025(html: str, snapshot_url: str):
         if visit_a and visit_a.get("href"):
             record["visit_site_text"] = visit_a.get_text(" ", strip=True)
             href = visit_a.get("href").strip()
-            record["visit_site_link"] = urljoin(BASE_URL, href) if href.startswith("/") else href
+            record["visit_site_link"] = abs_url(href) if href.startswith("/") else href
         else:
             record["visit_site_text"] = None
             record["visit_site_link"] = None
@@ -1688,8 +1738,8 @@ def parse_2025(html: str, snapshot_url: str):
         if iframe:
             data_src = iframe.get("data-src")
             src_attr = iframe.get("src")
-            record["iframe_data_src"] = urljoin(BASE_URL, data_src) if data_src else None
-            record["iframe_src"] = urljoin(BASE_URL, src_attr) if src_attr else None
+            record["iframe_data_src"] = abs_url(data_src) if data_src else None
+            record["iframe_src"] = abs_url(src_attr) if src_attr else None
         else:
             record["iframe_data_src"] = None
             record["iframe_src"] = None
@@ -1706,33 +1756,34 @@ def parse_2025(html: str, snapshot_url: str):
 
                 # link + title
                 a = box.find("a", class_="list_href")
-                list_href = urljoin(BASE_URL, a.get("href")) if a and a.get("href") else None
+                href = a.get("href") if a else None
+                list_href = abs_url(href) if href else None
                 title_tag = a.find(class_="ai_list_title") if a else box.find(class_="ai_list_title")
                 title = title_tag.get_text(" ", strip=True) if title_tag else None
 
                 # background image (from style attr on box)
                 bg_style = box.get("style") or ""
                 bg_url = None
-                m = re.search(r'url\((.*?)\)', bg_style)
+                m = BG_URL_RE.search(bg_style)
                 if m:
                     raw = m.group(1).strip().strip('"').strip("'")
-                    bg_url = urljoin(BASE_URL, raw) if raw and not raw.startswith("data:") else raw
+                    bg_url = abs_url(raw) if raw and not raw.startswith("data:") else raw
 
                 # subscriber count (follow_counter) and tools_count
-                follow_counter_tag = box.select_one(".follow_counter")
+                follow_counter_tag = box.select_one(SEL_FOLLOW_COUNTER)
                 follow_counter = to_int_or_none(follow_counter_tag.get_text(strip=True)) if follow_counter_tag else None
 
-                tools_counter_tag = box.select_one(".tools_counter")
+                tools_counter_tag = box.select_one(SEL_TOOLS_COUNTER)
                 tools_counter = to_int_or_none(tools_counter_tag.get_text(strip=True)) if tools_counter_tag else None
 
                 # number of tools maybe in .tools_counter or .tools_counter sibling (fallback)
                 # icons: collect all icon images inside .ai_list_icons
                 icons = []
-                for img in box.select(".ai_list_icons img.taaft_icon"):
+                for img in box.select(SEL_LIST_ICONS):
                     alt = img.get("alt") or None
                     src = img.get("src") or None
                     if src:
-                        src = urljoin(BASE_URL, src)
+                        src = abs_url(src)
                     icons.append({"alt": alt, "src": src})
 
                 # author (in footer)
@@ -1746,7 +1797,7 @@ def parse_2025(html: str, snapshot_url: str):
                         name_tag = a2.find("div", class_="user_name") or a2.find("span", class_="user_name")
                         author_name = name_tag.get_text(" ", strip=True) if name_tag else a2.get_text(" ", strip=True)
                         href = a2.get("href")
-                        author_profile = urljoin(BASE_URL, href) if href else None
+                        author_profile = abs_url(href) if href else None
 
                 lists.append({
                     "data_id": data_id,
@@ -1765,7 +1816,7 @@ def parse_2025(html: str, snapshot_url: str):
                 continue
 
         record["ai_lists_count"] = len(lists) if lists else 0
-        record["ai_lists_json"] = json.dumps(lists, ensure_ascii=False) if lists else json.dumps([], ensure_ascii=False)
+        record["ai_lists_json"] = to_json(lists) if lists else None
 
         # -------------------------
         # single task_label extraction (name + link)
@@ -1779,7 +1830,7 @@ def parse_2025(html: str, snapshot_url: str):
 
                 # absolute link
                 href = tlabel.get("href")
-                record["task_label_url"] = urljoin(BASE_URL, href) if href else None
+                record["task_label_url"] = abs_url(href) if href else None
             else:
                 record["task_label_name"] = None
                 record["task_label_url"] = None
@@ -1812,74 +1863,102 @@ def parse_2025(html: str, snapshot_url: str):
                     qa_items.append({"question": question, "answer": answer})
 
             record["faq_count"] = len(qa_items)
-            record["faq_json"] = json.dumps(qa_items, ensure_ascii=False) if qa_items else json.dumps([], ensure_ascii=False)
+            record["faq_json"] = to_json(qa_items) if qa_items else None
         else:
             record["faq_count"] = None
             record["faq_json"] = None
         # -------------------------
         # extract multiple <li class="li ..."> blocks -> top_alternative_json + top_alternative_count
         # -------------------------
+        # one walk over the <li data-id> cards feeds both top_alternative_json and
+        # featured_items_json; subtrees both read are looked up once per card
         li_items = []
+        featured_items = []
         # find all <li> elements with a data-id and class containing 'li' (handles many variants)
         for li in soup.find_all("li", attrs={"data-id": True}):
+            # shared prelude for both card outputs: a bad card is skipped for both,
+            # the rest of the page still parses
+            try:
+                attrs = li.attrs  # data-* reads below go straight to the dict
+                # one sweep over the card instead of a find() per field; setdefault
+                # keeps the first match in document order, as find() would
+                card = {}
+                iframes = []
+                for el in li.find_all(True):
+                    if el.name == "iframe":
+                        iframes.append(el)
+                    for cls in el.get("class") or ():
+                        if cls in CARD_CLASSES:
+                            card.setdefault((el.name, cls), el)
+                            card.setdefault(cls, el)
+
+                ai_link_tag = card.get(("a", "ai_link"))
+                ai_page = abs_url(ai_link_tag.get("href")) if ai_link_tag and ai_link_tag.get("href") else None
+                short_desc_tag = card.get(("div", "short_desc"))
+                short_desc = short_desc_tag.get_text(" ", strip=True) if short_desc_tag else None
+                stats_anchor = card.get(("a", "stats"))
+                price_tag = card.get(("a", "ai_launch_date"))
+                price_text = leaf_text(price_tag) if price_tag else None
+                released_tag = card.get(("div", "released"))
+                released_rel = None
+                if released_tag:
+                    rel = released_tag.find("span", class_="relative")
+                    released_rel = leaf_text(rel) if rel else None
+            except Exception as e:
+                print(f"[li parse] skipped an li due to: {e}")
+                continue
+
             try:
-                data_id = li.get("data-id")
-                data_name = li.get("data-name")
-                data_task = li.get("data-task")
-                data_task_id = li.get("data-task_id")
-                data_url = li.get("data-url")
-                data_release = li.get("data-release")
-
-                # ai details: link to AI page and current version inside .ai_link.new_tab
-                ai_link_tag = li.find("a", class_="ai_link")
-                ai_page = urljoin(BASE_URL, ai_link_tag.get("href")) if ai_link_tag and ai_link_tag.get("href") else None
+                data_id = attrs.get("data-id")
+                data_name = attrs.get("data-name")
+                data_task = attrs.get("data-task")
+                data_task_id = attrs.get("data-task_id")
+                data_url = attrs.get("data-url")
+                data_release = attrs.get("data-release")
+
+                # ai details: current version inside .ai_link.new_tab
                 ai_title = ai_link_tag.get_text(" ", strip=True) if ai_link_tag else None
                 current_version_tag = ai_link_tag.find(class_="current_version") if ai_link_tag else None
-                current_version = current_version_tag.get_text(" ", strip=True) if current_version_tag else None
-
-                # short description
-                short_desc_tag = li.find("div", class_="short_desc")
-                short_desc = short_desc_tag.get_text(" ", strip=True) if short_desc_tag else None
+                current_version = leaf_text(current_version_tag) if current_version_tag else None
 
             
                 # open / status text (span.open_ai etc.)
-                status_tag = li.find("span", class_="open_ai")
-                status = status_tag.get_text(" ", strip=True) if status_tag else None
+                status_tag = card.get(("span", "open_ai"))
+                status = leaf_text(status_tag) if status_tag else None
 
                 # views / saves / rating (from .stats or .views_count_count etc.)
-                # try the li-level stats first (common pattern)
-                stats_anchor = li.find("a", class_="stats")
+                # li-level stats first (common pattern)
                 views = None
                 saves = None
                 rating = None
                 if stats_anchor:
-                    views_tag = stats_anchor.select_one(".stats_views span") or stats_anchor.select_one(".stats_views")
+                    views_tag = stats_anchor.select_one(SEL_STATS_VIEWS_SPAN) or stats_anchor.select_one(SEL_STATS_VIEWS)
                     if views_tag:
                         # get inner number text, fallback to span text
                         views_text = views_tag.get_text(" ", strip=True)
                         # try to extract digits (handles commas)
-                        m = re.search(r"(\d[\d,]*)", views_text)
-                        views = to_int_or_none(m.group(1).replace(",", "")) if m else to_int_or_none(views_text)
-                    saves_tag = stats_anchor.select_one(".saves")
+                        m = INT_COMMA_RE.search(views_text)
+                        views = int(m.group(1).replace(",", "")) if m else to_int_or_none(views_text)
+                    saves_tag = stats_anchor.select_one(SEL_SAVES)
                     if saves_tag:
                         saves = to_int_or_none(saves_tag.get_text(" ", strip=True))
-                    rating_tag = stats_anchor.select_one(".average_rating")
+                    rating_tag = stats_anchor.select_one(SEL_AVG_RATING)
                     if rating_tag:
                         # rating often like: <span class="star star-full"></span>3.8
                         # extract the numeric part
                         rt = rating_tag.get_text(" ", strip=True)
-                        m2 = re.search(r"(\d+(?:\.\d+)?)", rt)
+                        m2 = FLOAT_RE.search(rt)
                         rating = float(m2.group(1)) if m2 else None
 
                 # video / visit site snippet (if present)
-                visit_link_tag = li.find("a", class_="visit_ai_website_link")
+                visit_link_tag = card.get(("a", "visit_ai_website_link"))
                 visit_site = visit_link_tag.get_text(" ", strip=True) if visit_link_tag else None
                 visit_site_link = visit_link_tag.get("href") if visit_link_tag and visit_link_tag.get("href") else None
                 if visit_site_link:
-                    visit_site_link = urljoin(BASE_URL, visit_site_link) if visit_site_link.startswith("/") else visit_site_link
+                    visit_site_link = abs_url(visit_site_link) if visit_site_link.startswith("/") else visit_site_link
 
                 # video views (alternative location)
-                vid_views_tag = li.select_one(".views_count_count")
+                vid_views_tag = card.get("views_count_count")
                 video_views = None
                 if vid_views_tag:
                     raw_v = vid_views_tag.get_text(" ", strip=True)
@@ -1887,13 +1966,13 @@ def parse_2025(html: str, snapshot_url: str):
 
                 # capture any iframe srcs under this li (list)
                 iframe_srcs = []
-                for iframe in li.find_all("iframe"):
+                for iframe in iframes:
                     src = iframe.get("src") or iframe.get("data-src")
                     if src:
-                        iframe_srcs.append(urljoin(BASE_URL, src))
+                        iframe_srcs.append(abs_url(src))
 
                 # changelog / author info inside .version_changelog (if exists)
-                changelog = li.find("div", class_="version_changelog")
+                changelog = card.get(("div", "version_changelog"))
                 changelog_author = None
                 changelog_body = None
                 changelog_upvotes = None
@@ -1907,20 +1986,9 @@ def parse_2025(html: str, snapshot_url: str):
                     if up_tag:
                         changelog_upvotes = to_int_or_none(up_tag.get_text(" ", strip=True))
 
-                # price / launch link area
-                price_tag = li.find("a", class_="ai_launch_date")
-                price_text = price_tag.get_text(" ", strip=True) if price_tag else None
-
-                # released relative text
-                released_tag = li.find("div", class_="released")
-                released_rel = None
-                if released_tag:
-                    rel = released_tag.find("span", class_="relative")
-                    released_rel = rel.get_text(" ", strip=True) if rel else None
-
                 # icon src
-                icon_img = li.find("img", class_="taaft_icon")
-                icon_src = urljoin(BASE_URL, icon_img.get("src")) if icon_img and icon_img.get("src") else None
+                icon_img = card.get(("img", "taaft_icon"))
+                icon_src = abs_url(icon_img.get("src")) if icon_img and icon_img.get("src") else None
                 icon_alt = icon_img.get("alt") if icon_img and icon_img.get("alt") else None
 
                 li_items.append({
@@ -1953,88 +2021,60 @@ def parse_2025(html: str, snapshot_url: str):
             except Exception as e:
                 # skip this li if it fails but continue
                 print(f"[li parse] skipped an li due to: {e}")
-                continue
-
-        record["top_alternative_count"] = len(li_items)
-        record["top_alternative_json"] = json.dumps(li_items, ensure_ascii=False) if li_items else json.dumps([], ensure_ascii=False)
-
-       # -------------------------
-        # featured / list li cards (tf_xyz3 etc.)
-        # -------------------------
-        featured_items = []
 
-        for li in soup.find_all("li", attrs={"data-id": True}):
+            # -------------------------
+            # featured / list li cards (tf_xyz3 etc.)
+            # -------------------------
             try:
                 # basic attributes from <li>
-                item_id = li.get("data-id")
-                name_attr = li.get("data-name")
-                task_attr = li.get("data-task")
-                task_id = li.get("data-task_id")
-                task_slug = li.get("data-task_slug")
-                featured = li.get("data-featured") == "true"
-                release_attr = li.get("data-release")
-
-                # AI page link + name + version
-                ai_link = li.find("a", class_="ai_link")
+                item_id = attrs.get("data-id")
+                name_attr = attrs.get("data-name")
+                task_attr = attrs.get("data-task")
+                task_id = attrs.get("data-task_id")
+                task_slug = attrs.get("data-task_slug")
+                featured = attrs.get("data-featured") == "true"
+                release_attr = attrs.get("data-release")
+
+                # AI page name + version
                 ai_name = None
-                ai_page = None
                 version = None
-                if ai_link:
-                    ai_page = ai_link.get("href")
-                    ai_page = urljoin(BASE_URL, ai_page) if ai_page else None
+                if ai_link_tag:
+                    name_span = ai_link_tag.find("span")
+                    ai_name = leaf_text(name_span) if name_span else None
 
-                    name_span = ai_link.find("span")
-                    ai_name = name_span.get_text(" ", strip=True) if name_span else None
-
-                    version_span = ai_link.find("span", class_="current_version")
-                    version = version_span.get_text(" ", strip=True) if version_span else None
+                    version_span = ai_link_tag.find("span", class_="current_version")
+                    version = leaf_text(version_span) if version_span else None
 
                 # external website
-                ext = li.find("a", class_="external_ai_link")
+                ext = card.get(("a", "external_ai_link"))
                 external_url = ext.get("href") if ext and ext.get("href") else None
 
-                # short description
-                desc_tag = li.find("div", class_="short_desc")
-                short_desc = desc_tag.get_text(" ", strip=True) if desc_tag else None
-
                 # task label (name + link)
-                task_label_tag = li.find("a", class_="task_label")
+                task_label_tag = card.get(("a", "task_label"))
                 task_label_name = task_label_tag.get_text(" ", strip=True) if task_label_tag else None
                 task_label_url = (
-                    urljoin(BASE_URL, task_label_tag.get("href"))
+                    abs_url(task_label_tag.get("href"))
                     if task_label_tag and task_label_tag.get("href")
                     else None
                 )
 
-                # released relative date
-                released_relative = None
-                released_tag = li.find("div", class_="released")
-                if released_tag:
-                    rel = released_tag.find("span", class_="relative")
-                    released_relative = rel.get_text(" ", strip=True) if rel else None
-
-                # pricing
-                price_tag = li.find("a", class_="ai_launch_date")
-                pricing = price_tag.get_text(" ", strip=True) if price_tag else None
-
                 # stats (views, saves, rating)
                 views = None
                 saves = None
                 rating = None
 
-                stats = li.find("a", class_="stats")
-                if stats:
-                    views_tag = stats.select_one(".stats_views span")
+                if stats_anchor:
+                    views_tag = stats_anchor.select_one(SEL_STATS_VIEWS_SPAN)
                     if views_tag:
                         views = to_int_or_none(views_tag.get_text(strip=True).replace(",", ""))
 
-                    saves_tag = stats.select_one(".saves")
+                    saves_tag = stats_anchor.select_one(SEL_SAVES)
                     if saves_tag:
                         saves = to_int_or_none(saves_tag.get_text(strip=True))
 
-                    rating_tag = stats.select_one(".average_rating")
+                    rating_tag = stats_anchor.select_one(SEL_AVG_RATING)
                     if rating_tag:
-                        m = re.search(r"(\d+(?:\.\d+)?)", rating_tag.get_text(" ", strip=True))
+                        m = FLOAT_RE.search(rating_tag.get_text(" ", strip=True))
                         rating = float(m.group(1)) if m else None
 
                 featured_items.append({
@@ -2051,8 +2091,8 @@ def parse_2025(html: str, snapshot_url: str):
                     "task_label_url": task_label_url,
                     "featured": featured,
                     "release_info": release_attr,
-                    "released_relative": released_relative,
-                    "pricing": pricing,
+                    "released_relative": released_rel,
+                    "pricing": price_text,
                     "views": views,
                     "saves": saves,
                     "rating": rating
@@ -2060,13 +2100,15 @@ def parse_2025(html: str, snapshot_url: str):
 
             except Exception as e:
                 print(f"[featured li parse] skipped one due to: {e}")
-                continue
+
+        record["top_alternative_count"] = len(li_items)
+        record["top_alternative_json"] = to_json(li_items) if li_items else None
 
         record["featured_items_count"] = len(featured_items)
         record["featured_items_json"] = (
-            json.dumps(featured_items, ensure_ascii=False)
+            to_json(featured_items)
             if featured_items
-            else json.dumps([], ensure_ascii=False)
+            else None
         )
 
     except Exception as e:
@@ -2074,9 +2116,17 @@ def parse_2025(html: str, snapshot_url: str):
 
     return record
 
+# 2024/2025 tool pages always carry one of these; archive error / redirect
+# stubs carry neither, so they can skip the soup entirely
+TOOL_PAGE_MARKERS = ("title_inner", "ai_top_link")
+
 def dispatch_parse(html, snapshot_url):
     year, _ = extract_year_ts(snapshot_url)
     try:
+        if year in ("2024", "2025") and not any(m in html for m in TOOL_PAGE_MARKERS):
+            r = init_snapshot_record(year, snapshot_url)
+            r["error"] = "empty_stub"
+            return r
         if year == "2023":
             return parse_2023(html, snapshot_url)
         if year == "2024":
@@ -2093,42 +2143,117 @@ def dispatch_parse(html, snapshot_url):
         r["error"] = str(e)
         return r
 
+# ================= INPUT =================
+
+def iter_pending_urls(processed):
+    """Stream INPUT_CSV in chunks, yielding lists of urls still to fetch."""
+    # only the wayback column is ever used; skip materializing the rest
+    reader = pd.read_csv(
+        INPUT_CSV,
+        dtype=str,
+        usecols=lambda c: c == WAYBACK_COLUMN,
+        chunksize=INPUT_CHUNK_ROWS
+    )
+    for chunk in reader:
+        # drop already-processed + duplicate urls so workers never see them;
+        # queued urls go straight into processed, which doubles as the seen set
+        # (plain set lookups: Series.isin would rehash the whole set per chunk)
+        urls = []
+        for u in chunk[WAYBACK_COLUMN].dropna().astype(str):
+            if u not in processed:
+                processed.add(u)
+                urls.append(u)
+        yield urls
+
+# ================= OUTPUT =================
+
+def append_rows(rows):
+    # append-only: never re-read / rewrite what is already on disk, and no
+    # DataFrame on the flush path (records already share one fixed key set)
+    new_file = not os.path.exists(OUT_CSV)
+    with open(OUT_CSV, "a", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=GLOBAL_COLUMNS, extrasaction="ignore", lineterminator="\n")
+        if new_file:
+            w.writeheader()
+        w.writerows(rows)
+
+
+def load_checkpoint():
+    processed = set()
+    if os.path.exists(LEGACY_CHECKPOINT_FILE):
+        with open(LEGACY_CHECKPOINT_FILE) as f:
+            processed.update(json.load(f))
+    if os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE, "rb") as f:
+            for line in f:
+                try:
+                    processed.add(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    pass  # torn last line from an interrupted run
+    return processed
+
+
+def compact_checkpoint(processed):
+    # rewrite the log as one line per url (drops duplicates / torn lines)
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, "wb") as f:
+        f.writelines(orjson.dumps(u) + b"\n" for u in processed)
+    os.replace(tmp, CHECKPOINT_FILE)
+
+
+def append_checkpoint(f, urls):
+    # O(new urls) per flush instead of re-dumping the whole processed set
+    f.writelines(orjson.dumps(u) + b"\n" for u in urls)
+    f.flush()
+
+
+def write_batch(ckpt, rows, urls):
+    # rows before their checkpoint entries: a crash in between only re-fetches
+    append_rows(rows)
+    append_checkpoint(ckpt, urls)
+
 # ================= MAIN =================
 
 async def main():
-    df = pd.read_csv(INPUT_CSV, dtype=str)
-    if WAYBACK_COLUMN not in df.columns:
+    if WAYBACK_COLUMN not in pd.read_csv(INPUT_CSV, nrows=0).columns:
         raise SystemExit("missing_wayback_urls column not found")
 
-    urls = df[WAYBACK_COLUMN].dropna().astype(str).tolist()
-    processed = set(json.load(open(CHECKPOINT_FILE))) if os.path.exists(CHECKPOINT_FILE) else set()
-
-    conn = aiohttp.TCPConnector(limit=CONCURRENCY, force_close=True)
-    async with aiohttp.ClientSession(connector=conn) as session:
-
-        buffer = []
-        lock = asyncio.Lock()
-        sem = asyncio.Semaphore(CONCURRENCY)
-        remaining = len(urls) - len(processed)
-        bar = tqdm(
-            total=remaining,
-            desc="Snapshots",
-            mininterval=0.5,
-            smoothing=0.1,
-            dynamic_ncols=True
-        )
-
+    processed = load_checkpoint()
+    compact_checkpoint(processed)
+
+    # keep-alive pool: every request goes to web.archive.org, so reusing
+    # sockets skips a TCP + TLS handshake (and a DNS lookup) per snapshot
+    conn = aiohttp.TCPConnector(
+        limit=CONCURRENCY,
+        limit_per_host=CONCURRENCY,
+        ttl_dns_cache=600,
+        keepalive_timeout=75
+    )
+    loop = asyncio.get_running_loop()
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as parse_pool, open(CHECKPOINT_FILE, "ab") as ckpt:
+        async with aiohttp.ClientSession(connector=conn) as session:
+
+            buffer = []
+            done = []  # urls in buffer, appended to the checkpoint on flush
+            lock = asyncio.Lock()
+            flush_due = asyncio.Event()  # set by workers once SAVE_EVERY rows are buffered
+            stop = asyncio.Event()
+            bar = tqdm(
+                total=0,  # grows as INPUT_CSV is streamed in
+                desc="Snapshots",
+                mininterval=0.5,
+                smoothing=0.1,
+                dynamic_ncols=True
+            )
 
 
-        async def worker(url):
-            if url in processed:
-                return
 
-            async with sem:
+            async def worker(url):
                 html, err = await fetch(session, url)
 
                 if html:
-                    rec = dispatch_parse(html, url)
+                    # parsing is pure CPU: run it off the event loop, in another process
+                    rec = await loop.run_in_executor(parse_pool, dispatch_parse, html, url)
                 else:
                     y, ts = extract_year_ts(url)
                     rec = init_record(y)
@@ -2138,48 +2263,77 @@ async def main():
 
                 async with lock:
                     buffer.append(rec)
+                    done.append(url)
                     processed.add(url)
                     bar.update(1)
 
                     if len(buffer) >= SAVE_EVERY:
-                        df_tmp = pd.DataFrame(buffer, columns=GLOBAL_COLUMNS)
-                        if os.path.exists(OUT_CSV):
-                            df_old = pd.read_csv(OUT_CSV, dtype=str)
-                            df_tmp = pd.concat([df_old, df_tmp], ignore_index=True)
-                        df_tmp.to_csv(OUT_CSV, index=False)
-                        buffer.clear()
-                        json.dump(list(processed), open(CHECKPOINT_FILE, "w"))
-
-
-        queue = asyncio.Queue()
-
-        for u in urls:
-            await queue.put(u)
+                        flush_due.set()
 
-        async def queue_worker():
-            while not queue.empty():
-                url = await queue.get()
-                try:
+            # single writer: workers never touch the disk; this task swaps the
+            # buffer out and writes it in a thread, so fetches keep flowing
+            async def flusher():
+                while True:
+                    try:
+                        await asyncio.wait_for(flush_due.wait(), FLUSH_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    flush_due.clear()
+                    last = stop.is_set()  # read before the swap: nothing can follow it
+                    async with lock:
+                        rows, urls = buffer[:], done[:]
+                        buffer.clear()
+                        done.clear()
+                    if rows:
+                        await asyncio.to_thread(write_batch, ckpt, rows, urls)
+                    if last:
+                        return
+
+            # bounded queue + fixed worker pool: the producer blocks when workers
+            # lag, and there are only ever CONCURRENCY tasks in flight
+            queue = asyncio.Queue(maxsize=CONCURRENCY * 2)
+
+            async def queue_worker():
+                while True:
+                    url = await queue.get()
+                    if url is None:
+                        return
                     await worker(url)
-                finally:
-                    queue.task_done()
 
-        workers = [asyncio.create_task(queue_worker()) for _ in range(CONCURRENCY)]
-        await queue.join()
+            workers = [asyncio.create_task(queue_worker()) for _ in range(CONCURRENCY)]
 
-        for w in workers:
-            w.cancel()
+            async def produce():
+                for batch in iter_pending_urls(processed):
+                    bar.total += len(batch)
+                    bar.refresh()
+                    for u in batch:
+                        await queue.put(u)
+                for _ in workers:
+                    await queue.put(None)
 
-        if buffer:
-            df_new = pd.DataFrame(buffer, columns=GLOBAL_COLUMNS)
-            if os.path.exists(OUT_CSV):
-                df_old = pd.read_csv(OUT_CSV, dtype=str)
-                df_new = pd.concat([df_old, df_new], ignore_index=True)
-
-            df_new.to_csv(OUT_CSV, index=False)
-
-        json.dump(list(processed), open(CHECKPOINT_FILE, "w"))
-        bar.close()
+            crawl = {asyncio.create_task(produce()), *workers}
+            flush_task = asyncio.create_task(flusher())
+            try:
+                # watch the crawl and the flusher together so a failing worker or
+                # write aborts right away instead of surfacing at the very end
+                # (the flusher only returns once stopped, so it never ends cleanly here)
+                pending = set(crawl)
+                while pending:
+                    finished, _ = await asyncio.wait(pending | {flush_task}, return_when=asyncio.FIRST_COMPLETED)
+                    for t in finished:
+                        t.result()
+                    pending -= finished
+            finally:
+                # on any exit (done, error, Ctrl-C) stop the crawl, then let the
+                # flusher write the last partial buffer and exit
+                for t in crawl:
+                    t.cancel()
+                await asyncio.gather(*crawl, return_exceptions=True)
+                stop.set()
+                flush_due.set()
+                if not flush_task.cancelled():
+                    await flush_task
+                bar.close()
 
 if __name__ == "__main__":
     asyncio.run(main())